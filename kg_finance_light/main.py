@@ -4,16 +4,40 @@ Simple Knowledge Graph Pipeline with Neo4j
 """
 import os
 import re
-import pandas as pd
+import sys
+import csv
 from neo4j import GraphDatabase
-import spacy
 from pathlib import Path
 import logging
+from collections import defaultdict
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Trailing date / money phrases cut from the tail in one pass
+_TAIL_CLEAN_RE = re.compile(r'\s+(?:in|for|by|with|at)\s+\d{4}.*|\s+\$\d+.*')
+
+# Literal keywords every pattern requires; text without any of them can't match
+_TRIGGERS = ("acquired", "bought", "purchased", "invested", "launched", "founded", "ceo")
+
+# Rows sent per UNWIND write transaction
+_WRITE_BATCH_SIZE = 10000
+
+# Sentence boundary: whitespace after terminal punctuation
+_SENT_RE = re.compile(r'(?<=[.!?])\s+')
+
+
+def iter_sentences(path):
+    """Yield sentences from a text file one line at a time"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            for sentence in _SENT_RE.split(line):
+                sentence = sentence.strip()
+                if sentence:
+                    yield sentence
+
+
 class SimpleKG:
     def __init__(self):
         # Neo4j connection
@@ -21,17 +45,54 @@ class SimpleKG:
         self.user = "neo4j"
         self.password = "neo4j"
         
-        # Load spaCy model
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-            logger.info("✅ spaCy model loaded")
-        except:
-            logger.error("❌ spaCy model not found. Install with: python -m spacy download en_core_web_sm")
-            raise
+        # spaCy model is only needed for extract_entities; loaded on first use
+        self._nlp = None
         
-        # Connect to Neo4j
-        self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
+        # Relation patterns
+        raw_patterns = {
+            "ACQUIRED": r'\b(\w+(?:\s+\w+)*)\s+(?:acquired|bought|purchased)\s+([\w\s]+)',
+            "INVESTED_IN": r'\b(\w+)\s+invested\s+(?:\$\d+(?:\s+\w+)*\s+)?in\s+([\w\s]+)',
+            "LAUNCHED": r'\b(\w+)\s+launched\s+([\w\s]+)',
+            "CEO_OF": r'\b([A-Z][a-z]+\s+[A-Z][a-z]+)\s+is\s+(?:the\s+)?CEO\s+of\s+(\w+)',
+            "FOUNDED": r'\b([A-Z][a-z]+\s+[A-Z][a-z]+)\s+founded\s+([\w\s]+)'
+        }
+        # Known relations double as the whitelist of Neo4j relationship types
+        self.relation_types = frozenset(raw_patterns)
+
+        # One compiled regex per relation, each scanned separately so matches
+        # of different relations may overlap (e.g. two clauses in a sentence)
+        self._patterns = [
+            (sys.intern(rel_type), re.compile(pattern))
+            for rel_type, pattern in raw_patterns.items()
+        ]
+
+        # Connect to Neo4j; the pool is sized and kept alive so the write
+        # burst and the queries that follow reuse the same sockets
+        self.driver = GraphDatabase.driver(
+            self.uri,
+            auth=(self.user, self.password),
+            max_connection_pool_size=50,
+            max_connection_lifetime=3600,
+            keep_alive=True,
+            connection_acquisition_timeout=60
+        )
         
+    @property
+    def nlp(self):
+        """spaCy pipeline, loaded lazily with only the NER components enabled"""
+        if self._nlp is None:
+            import spacy
+            try:
+                self._nlp = spacy.load(
+                    "en_core_web_sm",
+                    disable=["tagger", "parser", "attribute_ruler", "lemmatizer"]
+                )
+                logger.info("✅ spaCy model loaded")
+            except:
+                logger.error("❌ spaCy model not found. Install with: python -m spacy download en_core_web_sm")
+                raise
+        return self._nlp
+
     def extract_entities(self, text):
         """Extract entities using spaCy"""
         doc = self.nlp(text)
@@ -47,54 +108,91 @@ class SimpleKG:
     
     def extract_relations(self, text):
         """Extract relations using regex patterns"""
-        patterns = {
-            "ACQUIRED": r'(\w+(?:\s+\w+)*)\s+(?:acquired|bought|purchased)\s+([\w\s]+)',
-            "INVESTED_IN": r'(\w+)\s+invested\s+(?:\$\d+(?:\s+\w+)*\s+)?in\s+([\w\s]+)',
-            "LAUNCHED": r'(\w+)\s+launched\s+([\w\s]+)',
-            "CEO_OF": r'([A-Z][a-z]+\s+[A-Z][a-z]+)\s+is\s+(?:the\s+)?CEO\s+of\s+(\w+)',
-            "FOUNDED": r'([A-Z][a-z]+\s+[A-Z][a-z]+)\s+founded\s+([\w\s]+)'
-        }
-        
         triplets = []
-        for rel_type, pattern in patterns.items():
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if len(match.groups()) >= 2:
-                    head = match.group(1).strip()
-                    tail = match.group(2).strip()
-                    
-                    # Clean tail
-                    tail = re.sub(r'\s+(?:in|for|by|with|at)\s+\d{4}.*', '', tail)
-                    tail = re.sub(r'\s+\$\d+.*', '', tail)
-                    
-                    if head and tail:
-                        triplets.append({
-                            "head": head,
-                            "relation": rel_type,
-                            "tail": tail
-                        })
+
+        # Cheap substring prefilter before running the regex engine
+        text_lower = text.lower()
+        if not any(trigger in text_lower for trigger in _TRIGGERS):
+            return triplets
+
+        for rel_type, regex in self._patterns:
+            for match in regex.finditer(text):
+                head = match.group(1).strip()
+                tail = match.group(2).strip()
+
+                # Clean tail
+                tail = _TAIL_CLEAN_RE.sub('', tail)
+
+                # Entity names repeat across sentences; share one string object each
+                head = sys.intern(head)
+                tail = sys.intern(tail)
+
+                if head and tail:
+                    triplets.append({
+                        "head": head,
+                        "relation": rel_type,
+                        "tail": tail
+                    })
         
         return triplets
     
-    def create_graph(self, triplets):
+    def _clear_graph(self, session):
+        """Delete this pipeline's :Entity nodes, in batches where the server supports it"""
+        version = re.search(r'(\d+)\.(\d+)', self.driver.get_server_info().agent)
+        if version and (int(version.group(1)), int(version.group(2))) >= (4, 4):
+            session.run("CALL { MATCH (n:Entity) DETACH DELETE n } "
+                        "IN TRANSACTIONS OF 10000 ROWS").consume()
+        else:
+            session.run("MATCH (n:Entity) DETACH DELETE n").consume()
+
+    def create_graph(self, triplets, clear_existing=False):
         """Create graph in Neo4j"""
+        # Drop duplicate triplets so each relationship is merged once
+        unique = {(t["head"], t["relation"], t["tail"]): t for t in triplets}
+        triplets = list(unique.values())
+
         with self.driver.session() as session:
+            # Unique constraint is backed by an index, so MERGE on name seeks
+            # instead of scanning the label
+            session.run("CREATE CONSTRAINT entity_name_unique IF NOT EXISTS "
+                        "FOR (e:Entity) REQUIRE e.name IS UNIQUE")
+
             # Clear existing data
-            session.run("MATCH (n) DETACH DELETE n")
+            if clear_existing:
+                self._clear_graph(session)
             
-            # Create nodes and relationships
+            # Group rows by relation so each can use its own relationship type
+            rows_by_relation = defaultdict(list)
             for t in triplets:
-                query = """
-                MERGE (a:Entity {name: $head})
-                MERGE (b:Entity {name: $tail})
-                MERGE (a)-[r:RELATION {type: $relation}]->(b)
+                rows_by_relation[t["relation"]].append({"head": t["head"], "tail": t["tail"]})
+
+            # Create nodes and relationships, one UNWIND per batch
+            created_count = 0
+            for relation, rows in rows_by_relation.items():
+                # Relationship types can't be query parameters; only
+                # whitelisted names are interpolated into the query
+                if relation not in self.relation_types:
+                    logger.warning(f"Skipping unknown relation type: {relation}")
+                    continue
+
+                query = f"""
+                UNWIND $rows AS row
+                MERGE (a:Entity {{name: row.head}})
+                MERGE (b:Entity {{name: row.tail}})
+                MERGE (a)-[r:`{relation}`]->(b)
                 """
-                session.run(query, head=t["head"], tail=t["tail"], relation=t["relation"])
+                for start in range(0, len(rows), _WRITE_BATCH_SIZE):
+                    batch = rows[start:start + _WRITE_BATCH_SIZE]
+                    session.execute_write(lambda tx: tx.run(query, rows=batch).consume())
+                created_count += len(rows)
             
-            logger.info(f"✅ Created {len(triplets)} relationships in Neo4j")
+            logger.info(f"✅ Created {created_count} relationships in Neo4j")
     
-    def query_graph(self, cypher_query):
-        """Execute Cypher query"""
+    def query_graph(self, cypher_query, session=None):
+        """Execute Cypher query, optionally on an already open session"""
+        if session is not None:
+            return [dict(record) for record in session.run(cypher_query)]
+
         with self.driver.session() as session:
             result = session.run(cypher_query)
             return [dict(record) for record in result]
@@ -111,42 +209,39 @@ def main():
     kg = SimpleKG()
     
     try:
-        # 2. Read data
+        # 2. Locate data
         data_path = Path("data/raw_news.txt")
         if not data_path.exists():
             logger.error(f"❌ Data file not found: {data_path}")
             return
         
-        with open(data_path, 'r') as f:
-            text = f.read()
-        
-        logger.info(f"📄 Read {len(text)} characters from {data_path}")
-        
-        # 3. Split into sentences
-        sentences = [s.strip() for s in text.split('.') if s.strip()]
-        logger.info(f"📝 Split into {len(sentences)} sentences")
-        
-        # 4. Extract triplets
+        # 3. Stream sentences and extract triplets
+        logger.info(f"📄 Reading sentences from {data_path}")
         all_triplets = []
-        for i, sentence in enumerate(sentences, 1):
+        sentence_count = 0
+        for i, sentence in enumerate(iter_sentences(data_path), 1):
+            sentence_count = i
             triplets = kg.extract_relations(sentence)
             if triplets:
                 logger.info(f"  Sentence {i}: '{sentence[:50]}...' -> {len(triplets)} triplets")
                 all_triplets.extend(triplets)
         
+        logger.info(f"📝 Processed {sentence_count} sentences")
         logger.info(f"🎯 Total triplets extracted: {len(all_triplets)}")
         
-        # 5. Save to CSV
+        # 4. Save to CSV
         if all_triplets:
-            df = pd.DataFrame(all_triplets)
             output_path = Path("data/triplets.csv")
-            df.to_csv(output_path, index=False)
+            with open(output_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=["head", "relation", "tail"])
+                writer.writeheader()
+                writer.writerows(all_triplets)
             logger.info(f"💾 Saved triplets to {output_path}")
             
-            # 6. Create graph in Neo4j
-            kg.create_graph(all_triplets)
+            # 5. Create graph in Neo4j
+            kg.create_graph(all_triplets, clear_existing=True)
             
-            # 7. Run sample queries
+            # 6. Run sample queries
             queries = [
                 "MATCH (n) RETURN n.name as Entity, labels(n) as Labels LIMIT 10",
                 "MATCH (a)-[r]->(b) RETURN a.name as From, type(r) as Relationship, b.name as To LIMIT 10",
@@ -157,17 +252,19 @@ def main():
             print("📊 SAMPLE QUERIES RESULTS")
             print("="*60)
             
-            for i, query in enumerate(queries, 1):
-                print(f"\nQuery {i}: {query}")
-                try:
-                    results = kg.query_graph(query)
-                    if results:
-                        for j, row in enumerate(results, 1):
-                            print(f"  {j}. {row}")
-                    else:
-                        print("  No results")
-                except Exception as e:
-                    print(f"  Error: {e}")
+            # Reuse one session for all sample queries
+            with kg.driver.session() as session:
+                for i, query in enumerate(queries, 1):
+                    print(f"\nQuery {i}: {query}")
+                    try:
+                        results = kg.query_graph(query, session=session)
+                        if results:
+                            for j, row in enumerate(results, 1):
+                                print(f"  {j}. {row}")
+                        else:
+                            print("  No results")
+                    except Exception as e:
+                        print(f"  Error: {e}")
             
             print("\n" + "="*60)
             print("✅ PIPELINE COMPLETED SUCCESSFULLY!")
@@ -2,9 +2,11 @@
 Main pipeline for automated knowledge graph construction
 """
 import os
+import re
 import sys
 import yaml
 import logging
+from functools import cached_property
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -20,13 +22,47 @@ from query_nl import NaturalLanguageQuery
 # Load environment variables
 load_dotenv()
 
+# Prefer the libyaml C parser when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Parsed configs keyed by (path, mtime) so unchanged files aren't re-parsed
+_CONFIG_CACHE = {}
+
+
+def _load_config(config_path: str) -> dict:
+    """Load a YAML config file, reusing the parsed result while the file is unchanged"""
+    key = (config_path, os.stat(config_path).st_mtime_ns)
+    if key not in _CONFIG_CACHE:
+        with open(config_path, 'rb') as f:
+            _CONFIG_CACHE[key] = yaml.load(f, Loader=_YamlLoader)
+    return _CONFIG_CACHE[key]
+
+
+# A config value that is entirely a "${VAR}" reference
+_ENV_VAR_RE = re.compile(r'\$\{(.*)\}', re.DOTALL)
+
+
+def _replace_env_vars(obj):
+    """Replace "${VAR}" strings with environment values"""
+    # Containers are rebuilt, not mutated, so the cached parsed config stays intact
+    if isinstance(obj, str):
+        match = _ENV_VAR_RE.fullmatch(obj)
+        return os.getenv(match.group(1), obj) if match else obj
+    if isinstance(obj, dict):
+        return {k: _replace_env_vars(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_replace_env_vars(item) for item in obj]
+    return obj
+
 
 class KnowledgeGraphPipeline:
     def __init__(self, config_path: str = "config/config.yaml"):
         """Initialize pipeline with configuration"""
         # Load configuration
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+        self.config = _load_config(config_path)
 
         # Substitute environment variables
         self._substitute_env_vars()
@@ -34,31 +70,34 @@ class KnowledgeGraphPipeline:
         # Setup logging
         self._setup_logging()
 
-        # Initialize components
-        self.preprocessor = TextPreprocessor(self.config)
-        self.extractor = EntityRelationshipExtractor(self.config)
-        self.cleaner = DataCleaner(self.config)
-        self.graph_builder = Neo4jGraphBuilder(self.config)
-        self.query_engine = NaturalLanguageQuery(self.config)
-
         logger = logging.getLogger(__name__)
         logger.info("Knowledge Graph Pipeline initialized")
 
-    def _substitute_env_vars(self):
-        """Substitute environment variables in config"""
+    # Components are built on first access, so e.g. query-only runs never
+    # load the extraction model
+    @cached_property
+    def preprocessor(self) -> TextPreprocessor:
+        return TextPreprocessor(self.config)
 
-        def replace_env_vars(obj):
-            if isinstance(obj, str) and obj.startswith('${') and obj.endswith('}'):
-                env_var = obj[2:-1]
-                return os.getenv(env_var, obj)
-            elif isinstance(obj, dict):
-                return {k: replace_env_vars(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [replace_env_vars(item) for item in obj]
-            else:
-                return obj
+    @cached_property
+    def extractor(self) -> EntityRelationshipExtractor:
+        return EntityRelationshipExtractor(self.config)
+
+    @cached_property
+    def cleaner(self) -> DataCleaner:
+        return DataCleaner(self.config)
+
+    @cached_property
+    def graph_builder(self) -> Neo4jGraphBuilder:
+        return Neo4jGraphBuilder(self.config)
 
-        self.config = replace_env_vars(self.config)
+    @cached_property
+    def query_engine(self) -> NaturalLanguageQuery:
+        return NaturalLanguageQuery(self.config)
+
+    def _substitute_env_vars(self):
+        """Substitute environment variables in config"""
+        self.config = _replace_env_vars(self.config)
 
     def _setup_logging(self):
         """Configure logging"""
@@ -91,12 +130,16 @@ class KnowledgeGraphPipeline:
 
             # Step 2: Entity and Relationship Extraction
             logger.info("Step 2: Entity and Relationship Extraction")
-            all_triplets = []
+            # API extraction is network-bound, so all sentences are sent
+            # concurrently; the local model generates a batch per call
+            if self.extractor.mode == "api":
+                results = self.extractor.extract_batch(sentences)
+            else:
+                results = []
+                for batch in self.preprocessor.batch_sentences(sentences):
+                    results.extend(self.extractor.extract_batch(batch))
 
-            for i, sentence in enumerate(sentences):
-                logger.debug(f"Processing sentence {i + 1}/{len(sentences)}")
-                triplets = self.extractor.extract_from_text(sentence)
-                all_triplets.extend(triplets)
+            all_triplets = [triplet for triplets in results for triplet in triplets]
 
             logger.info(f"Extracted {len(all_triplets)} triplets from {len(sentences)} sentences")
 
@@ -190,8 +233,11 @@ class KnowledgeGraphPipeline:
 
     def close(self):
         """Cleanup resources"""
-        self.graph_builder.close()
-        self.query_engine.close()
+        # Only close components that were actually created
+        if 'graph_builder' in self.__dict__:
+            self.graph_builder.close()
+        if 'query_engine' in self.__dict__:
+            self.query_engine.close()
         logger = logging.getLogger(__name__)
         logger.info("Pipeline resources cleaned up")
 
@@ -11,9 +11,8 @@ setup(
         "neo4j>=5.0.0",
         "python-dotenv>=1.0.0",
         "PyYAML>=6.0",
-        "transformers>=4.30.0",
+        "transformers>=4.37.0",
         "torch>=2.0.0",
-        "nltk>=3.8.0",
         "tqdm>=4.66.0",
     ],
     python_requires=">=3.8",
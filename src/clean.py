@@ -2,15 +2,41 @@ import pandas as pd
 import logging
 from typing import List, Dict, Tuple
 import re
+from itertools import groupby
+
+# Optional: Polars backend, selected with pipeline.cleaning_backend
+try:
+    import polars as pl
+except ImportError:
+    pl = None
 
 logger = logging.getLogger(__name__)
 
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _map_distinct_pd(values: pd.Series, rule, null_value: str) -> pd.Series:
+    """Apply a per-value rule once per distinct non-null value of a pandas Series"""
+    mapping = {value: rule(value) for value in values.dropna().unique()}
+    return values.map(mapping).where(values.notna(), null_value)
+
+
+def _map_distinct(values: "pl.Series", rule, null_value: str) -> "pl.Series":
+    """Apply a per-value rule once per distinct non-null value of a Polars Series"""
+    mapping = {value: rule(value) for value in values.drop_nulls().unique().to_list()}
+    return values.replace_strict(mapping, default=None, return_dtype=pl.Utf8).fill_null(null_value)
+
 
 class DataCleaner:
     def __init__(self, config: Dict):
         self.config = config
         self.confidence_threshold = config['pipeline']['confidence_threshold']
 
+        self.backend = config['pipeline'].get('cleaning_backend', 'pandas')
+        if self.backend == 'polars' and pl is None:
+            logger.warning("polars is not installed, using the pandas cleaner")
+            self.backend = 'pandas'
+
         # Standardization mappings
         self.relation_standardization = {
             'acquired': 'ACQUIRED',
@@ -32,11 +58,28 @@ class DataCleaner:
             'created': 'FOUNDED'
         }
 
+        # Keys contained in a relation, as one pattern per run of keys sharing a
+        # value; searched in mapping order, so the first key in the mapping wins
+        self._relation_key_res = [
+            (re.compile('|'.join(re.escape(key) for key, _ in keys)), value)
+            for value, keys in groupby(self.relation_standardization.items(), key=lambda item: item[1])
+        ]
+
+        # Entity type patterns, checked in this order
+        company_markers = ['Inc', 'Corp', 'Ltd', 'LLC', 'Co.', 'Company', 'Group']
+        self._company_re = re.compile('|'.join(re.escape(m) for m in company_markers))
+        self._person_re = re.compile(r'^[A-Z][a-z]+ [A-Z][a-z]+$')
+        self._date_re = re.compile(r'\d{4}|\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{4}\b')
+        self._currency_re = re.compile(r'\$\d+|\d+\s*(?:million|billion|trillion)|USD|EUR', re.IGNORECASE)
+
     def clean_triplets(self, triplets: List[Dict]) -> pd.DataFrame:
         """Clean and standardize extracted triplets"""
         if not triplets:
             return pd.DataFrame()
 
+        if self.backend == 'polars':
+            return self._clean_triplets_polars(triplets)
+
         # Convert to DataFrame
         df = pd.DataFrame(triplets)
 
@@ -44,47 +87,93 @@ class DataCleaner:
             return df
 
         # 1. Remove duplicates
-        initial_count = len(df)
-        df.drop_duplicates(subset=['head', 'relation', 'tail'], inplace=True)
-        logger.info(f"Removed {initial_count - len(df)} duplicate triplets")
+        keep = ~df.duplicated(subset=['head', 'relation', 'tail'])
+        logger.info(f"Removed {len(df) - keep.sum()} duplicate triplets")
 
         # 2. Filter by confidence
         if 'confidence' in df.columns:
-            df = df[df['confidence'] >= self.confidence_threshold].copy()
-            logger.info(f"Filtered to {len(df)} triplets above confidence {self.confidence_threshold}")
+            keep &= df['confidence'] >= self.confidence_threshold
+            logger.info(f"Filtered to {keep.sum()} triplets above confidence {self.confidence_threshold}")
+
+        # Both masks are applied at once, so later steps only see surviving rows
+        df = df.loc[keep].copy()
 
         # 3. Standardize relations
-        df['relation'] = df['relation'].apply(self._standardize_relation)
+        df['relation'] = _map_distinct_pd(df['relation'], self._standardize_relation, "UNKNOWN")
 
         # 4. Clean entity names
-        df['head'] = df['head'].apply(self._clean_entity_name)
-        df['tail'] = df['tail'].apply(self._clean_entity_name)
+        df['head'] = _map_distinct_pd(df['head'], self._clean_entity_name, "")
+        df['tail'] = _map_distinct_pd(df['tail'], self._clean_entity_name, "")
 
-        # 5. Remove invalid relations
+        # 5-6. Remove invalid relations and self-references
         valid_relations = self.config['extraction']['relation_types']
-        df = df[df['relation'].isin(valid_relations)].copy()
-
-        # 6. Remove self-references
-        df = df[df['head'] != df['tail']].copy()
+        df = df.loc[df['relation'].isin(valid_relations) & (df['head'] != df['tail'])].copy()
 
         # 7. Add entity types if missing
         if 'head_type' not in df.columns:
-            df['head_type'] = df['head'].apply(self._infer_entity_type)
+            df['head_type'] = _map_distinct_pd(df['head'], self._infer_entity_type, "UNKNOWN")
         if 'tail_type' not in df.columns:
-            df['tail_type'] = df['tail'].apply(self._infer_entity_type)
+            df['tail_type'] = _map_distinct_pd(df['tail'], self._infer_entity_type, "UNKNOWN")
 
         # 8. Sort by confidence (if available)
         if 'confidence' in df.columns:
             df = df.sort_values('confidence', ascending=False)
 
+        df = self._to_categoricals(df)
+
         logger.info(f"Cleaned data: {len(df)} valid triplets")
         return df
 
-    def _standardize_relation(self, relation: str) -> str:
-        """Standardize relation names"""
-        if pd.isna(relation):
-            return "UNKNOWN"
+    def _clean_triplets_polars(self, triplets: List[Dict]) -> pd.DataFrame:
+        """Clean and standardize triplets with Polars"""
+        df = pl.from_dicts(triplets, infer_schema_length=None)
+        columns = df.columns
+
+        # 1. Remove duplicates
+        df = df.unique(subset=['head', 'relation', 'tail'], keep='first', maintain_order=True)
+
+        # 2. Filter by confidence
+        if 'confidence' in columns:
+            df = df.filter(pl.col('confidence') >= self.confidence_threshold)
+
+        # 3-4. Standardize relations and clean entity names, using the same
+        # per-value rules as the pandas path
+        df = df.with_columns(
+            _map_distinct(df['relation'], self._standardize_relation, "UNKNOWN"),
+            _map_distinct(df['head'], self._clean_entity_name, ""),
+            _map_distinct(df['tail'], self._clean_entity_name, ""),
+        )
+
+        # 5-6. Remove invalid relations and self-references
+        valid_relations = self.config['extraction']['relation_types']
+        df = df.filter(pl.col('relation').is_in(valid_relations) & (pl.col('head') != pl.col('tail')))
+
+        # 7. Add entity types if missing
+        for side in ('head', 'tail'):
+            if f'{side}_type' not in columns:
+                df = df.with_columns(
+                    _map_distinct(df[side], self._infer_entity_type, "UNKNOWN").alias(f'{side}_type')
+                )
+
+        # 8. Sort by confidence (if available)
+        if 'confidence' in columns:
+            df = df.sort('confidence', descending=True, maintain_order=True)
+
+        result = self._to_categoricals(df.to_pandas())
+        logger.info(f"Cleaned data: {len(result)} valid triplets")
+        return result
 
+    def _to_categoricals(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Store the small-vocabulary columns as categoricals"""
+        valid_relations = self.config['extraction']['relation_types']
+        return df.astype({
+            'relation': pd.CategoricalDtype(categories=valid_relations),
+            'head_type': 'category',
+            'tail_type': 'category',
+        })
+
+    def _standardize_relation(self, relation) -> str:
+        """Standardize a single non-null relation name"""
         relation_str = str(relation).strip().lower()
 
         # Check direct mapping
@@ -92,22 +181,19 @@ class DataCleaner:
             return self.relation_standardization[relation_str]
 
         # Check if any key is contained in the relation
-        for key, value in self.relation_standardization.items():
-            if key in relation_str:
+        for key_re, value in self._relation_key_res:
+            if key_re.search(relation_str):
                 return value
 
         # Return uppercase version
         return relation_str.upper()
 
-    def _clean_entity_name(self, entity: str) -> str:
-        """Clean entity name"""
-        if pd.isna(entity):
-            return ""
-
+    def _clean_entity_name(self, entity) -> str:
+        """Clean a single non-null entity name"""
         entity_str = str(entity).strip()
 
         # Remove extra whitespace
-        entity_str = re.sub(r'\s+', ' ', entity_str)
+        entity_str = _WHITESPACE_RE.sub(' ', entity_str)
 
         # Remove trailing/leading quotes
         entity_str = entity_str.strip('"\'')
@@ -118,34 +204,18 @@ class DataCleaner:
 
         return entity_str
 
-    def _infer_entity_type(self, entity: str) -> str:
-        """Infer entity type from name patterns"""
-        if pd.isna(entity):
-            return "UNKNOWN"
-
+    def _infer_entity_type(self, entity) -> str:
+        """Infer the type of a single non-null entity name"""
         entity_str = str(entity)
 
-        # Company patterns
-        company_patterns = ['Inc', 'Corp', 'Ltd', 'LLC', 'Co.', 'Company', 'Group']
-        if any(pattern in entity_str for pattern in company_patterns):
+        if self._company_re.search(entity_str):
             return "COMPANY"
-
-        # Person patterns (capitalized names)
-        if re.match(r'^[A-Z][a-z]+ [A-Z][a-z]+$', entity_str):
+        if self._person_re.match(entity_str):
             return "PERSON"
-
-        # Date patterns
-        date_patterns = [r'\d{4}', r'\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]* \d{4}\b']
-        for pattern in date_patterns:
-            if re.search(pattern, entity_str):
-                return "DATE"
-
-        # Currency patterns
-        currency_patterns = [r'\$\d+', r'\d+\s*(million|billion|trillion)', r'USD', r'EUR']
-        for pattern in currency_patterns:
-            if re.search(pattern, entity_str, re.IGNORECASE):
-                return "CURRENCY"
-
+        if self._date_re.search(entity_str):
+            return "DATE"
+        if self._currency_re.search(entity_str):
+            return "CURRENCY"
         return "ENTITY"
 
 
@@ -1,13 +1,25 @@
+import asyncio
+import importlib.util
 import json
 import logging
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig, pipeline
 from .prompts import EXTRACTION_PROMPT_ZERO_SHOT, EXTRACTION_PROMPT_FEW_SHOT
-import re
 
 logger = logging.getLogger(__name__)
 
+# Shared decoder for pulling the JSON array out of model responses
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _split_prompt(template: str, **fields) -> Tuple[str, str]:
+    """Fill every field except {text} and return the prompt parts around it"""
+    marker = "\x00"
+    before, _, after = template.format(text=marker, **fields).partition(marker)
+    return before, after
+
 
 class EntityRelationshipExtractor:
     def __init__(self, config: Dict):
@@ -16,6 +28,14 @@ class EntityRelationshipExtractor:
         self.entity_types = config['extraction']['entity_types']
         self.relation_types = config['extraction']['relation_types']
 
+        # Prompts are formatted once; per call only the text is spliced in
+        self._zero_shot_parts = _split_prompt(
+            EXTRACTION_PROMPT_ZERO_SHOT,
+            entity_types=", ".join(self.entity_types),
+            relation_types=", ".join(self.relation_types)
+        )
+        self._few_shot_parts = _split_prompt(EXTRACTION_PROMPT_FEW_SHOT)
+
         if self.mode == "local":
             self._setup_local_model()
         elif self.mode == "api":
@@ -32,15 +52,39 @@ class EntityRelationshipExtractor:
 
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+            # Decoder-only models need left padding for batched generation
+            self.tokenizer.padding_side = "left"
+            if self.tokenizer.pad_token is None:
+                self.tokenizer.pad_token = self.tokenizer.eos_token
+            if device == "cuda":
+                # bfloat16 on Ampere and newer, float16 otherwise
+                dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            else:
+                dtype = torch.float32
+
+            # 4-bit NF4 weights cut memory traffic per decoded token (CUDA only)
+            quantization_config = None
+            quantize = device == "cuda" and self.config['llm'].get('quantization') == "4bit"
+            if quantize and importlib.util.find_spec("bitsandbytes") is None:
+                logger.warning("bitsandbytes is not installed, loading the model unquantized")
+                quantize = False
+            if quantize:
+                quantization_config = BitsAndBytesConfig(
+                    load_in_4bit=True,
+                    bnb_4bit_quant_type="nf4",
+                    bnb_4bit_compute_dtype=dtype,
+                    bnb_4bit_use_double_quant=True
+                )
+
             self.model = AutoModelForCausalLM.from_pretrained(
                 model_name,
-                torch_dtype=torch.float16 if device == "cuda" else torch.float32,
+                torch_dtype=dtype,
                 device_map="auto" if device == "cuda" else None,
+                quantization_config=quantization_config,
+                attn_implementation="sdpa",
                 low_cpu_mem_usage=True
             )
-
-            if device == "cpu":
-                self.model = self.model.to("cpu")
+            self.model.eval()
 
             logger.info("Local model loaded successfully")
 
@@ -50,10 +94,10 @@ class EntityRelationshipExtractor:
 
     def _setup_api_model(self):
         """Setup API-based model (OpenAI)"""
-        # For OpenAI API
-        import openai
-        openai.api_key = self.config['llm']['api_key']
-        self.api_client = openai
+        # For OpenAI API; without a configured key the client reads OPENAI_API_KEY
+        from openai import OpenAI
+        self.api_key = self.config['llm'].get('api_key')
+        self.api_client = OpenAI(api_key=self.api_key)
         logger.info("API model configured")
 
     def extract_from_text(self, text: str, use_few_shot: bool = False) -> List[Dict]:
@@ -63,59 +107,63 @@ class EntityRelationshipExtractor:
         else:
             return self._extract_api(text, use_few_shot)
 
+    def _build_prompt(self, text: str, use_few_shot: bool) -> str:
+        """Build the extraction prompt for text"""
+        before, after = self._few_shot_parts if use_few_shot else self._zero_shot_parts
+        return before + text + after
+
+    def extract_batch(self, texts: List[str], use_few_shot: bool = False) -> List[List[Dict]]:
+        """Extract entities and relationships from several texts"""
+        if self.mode == "local":
+            return self._extract_local_batch(texts, use_few_shot)
+        return self.extract_batch_api(texts, use_few_shot)
+
     def _extract_local(self, text: str, use_few_shot: bool) -> List[Dict]:
         """Extract using local model"""
-        if use_few_shot:
-            prompt = EXTRACTION_PROMPT_FEW_SHOT.format(text=text)
-        else:
-            prompt = EXTRACTION_PROMPT_ZERO_SHOT.format(
-                entity_types=", ".join(self.entity_types),
-                relation_types=", ".join(self.relation_types),
-                text=text
-            )
+        return self._extract_local_batch([text], use_few_shot)[0]
 
-        inputs = self.tokenizer(prompt, return_tensors="pt", truncation=True, max_length=2048)
+    def _extract_local_batch(self, texts: List[str], use_few_shot: bool) -> List[List[Dict]]:
+        """Extract using local model, generating for all texts in one call"""
+        if not texts:
+            return []
 
-        if self.config['llm']['device'] == "cuda":
-            inputs = {k: v.cuda() for k, v in inputs.items()}
+        prompts = [self._build_prompt(text, use_few_shot) for text in texts]
 
-        with torch.no_grad():
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True, truncation=True, max_length=2048)
+        inputs = inputs.to(self.model.device)
+
+        # Greedy decoding with the KV cache; extraction needs no sampling
+        with torch.inference_mode():
             outputs = self.model.generate(
                 **inputs,
                 max_new_tokens=500,
-                temperature=0.1,
-                do_sample=True,
-                pad_token_id=self.tokenizer.eos_token_id
+                do_sample=False,
+                use_cache=True,
+                pad_token_id=self.tokenizer.pad_token_id
             )
 
-        response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        # Decode only the generated tokens, not the echoed prompt
+        responses = self.tokenizer.batch_decode(
+            outputs[:, inputs["input_ids"].shape[1]:],
+            skip_special_tokens=True
+        )
 
-        # Parse JSON from response
-        triplets = self._parse_response(response)
+        # Parse JSON from each response
+        return [self._parse_response(response) for response in responses]
 
-        return triplets
+    def _api_messages(self, text: str, use_few_shot: bool) -> List[Dict]:
+        """Build the chat messages for an API extraction request"""
+        return [
+            {"role": "system", "content": "You are a financial knowledge graph extraction assistant."},
+            {"role": "user", "content": self._build_prompt(text, use_few_shot)}
+        ]
 
     def _extract_api(self, text: str, use_few_shot: bool) -> List[Dict]:
         """Extract using API (OpenAI)"""
-        if use_few_shot:
-            messages = [
-                {"role": "system", "content": "You are a financial knowledge graph extraction assistant."},
-                {"role": "user", "content": EXTRACTION_PROMPT_FEW_SHOT.format(text=text)}
-            ]
-        else:
-            messages = [
-                {"role": "system", "content": "You are a financial knowledge graph extraction assistant."},
-                {"role": "user", "content": EXTRACTION_PROMPT_ZERO_SHOT.format(
-                    entity_types=", ".join(self.entity_types),
-                    relation_types=", ".join(self.relation_types),
-                    text=text
-                )}
-            ]
-
         try:
-            response = self.api_client.ChatCompletion.create(
+            response = self.api_client.chat.completions.create(
                 model=self.config['llm']['api_model'],
-                messages=messages,
+                messages=self._api_messages(text, use_few_shot),
                 temperature=0.1,
                 max_tokens=500
             )
@@ -128,40 +176,93 @@ class EntityRelationshipExtractor:
             logger.error(f"API extraction error: {e}")
             return []
 
-    def _parse_response(self, response: str) -> List[Dict]:
-        """Parse JSON response from LLM"""
-        # Find JSON array in response
-        json_match = re.search(r'\[.*\]', response, re.DOTALL)
-
-        if not json_match:
-            logger.warning("No JSON array found in response")
-            return []
-
-        json_str = json_match.group()
+    def extract_batch_api(self, texts: List[str], use_few_shot: bool = False,
+                          concurrency: Optional[int] = None) -> List[List[Dict]]:
+        """Extract from several texts with up to `concurrency` API requests in flight"""
+        if concurrency is None:
+            concurrency = self.config['extraction'].get('concurrency', 8)
 
         try:
-            triplets = json.loads(json_str)
-
-            # Validate triplet structure
-            validated = []
-            for triplet in triplets:
-                if all(key in triplet for key in ['head', 'relation', 'tail']):
-                    # Add confidence if missing
-                    if 'confidence' not in triplet:
-                        triplet['confidence'] = 0.8
-
-                    # Ensure confidence is float
-                    triplet['confidence'] = float(triplet['confidence'])
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._extract_api_all(texts, use_few_shot, concurrency))
+
+        # Already inside an event loop (e.g. Jupyter), where asyncio.run is not
+        # allowed, so the requests run on a worker thread with its own loop
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(
+                asyncio.run, self._extract_api_all(texts, use_few_shot, concurrency)
+            ).result()
+
+    async def _extract_api_all(self, texts: List[str], use_few_shot: bool,
+                               concurrency: int) -> List[List[Dict]]:
+        """Run API extraction for all texts concurrently"""
+        from openai import AsyncOpenAI
+        semaphore = asyncio.Semaphore(concurrency)
+
+        # The async client is tied to this event loop, so it is created per run
+        async with AsyncOpenAI(api_key=self.api_key) as client:
+            async def extract(text: str) -> List[Dict]:
+                async with semaphore:
+                    return await self._extract_api_async(client, text, use_few_shot)
+
+            return await asyncio.gather(*(extract(text) for text in texts))
+
+    async def _extract_api_async(self, client, text: str, use_few_shot: bool) -> List[Dict]:
+        """Extract using API (OpenAI) without blocking the event loop"""
+        try:
+            response = await client.chat.completions.create(
+                model=self.config['llm']['api_model'],
+                messages=self._api_messages(text, use_few_shot),
+                temperature=0.1,
+                max_tokens=500
+            )
 
-                    validated.append(triplet)
+            content = response.choices[0].message.content
+            return self._parse_response(content)
 
-            logger.info(f"Extracted {len(validated)} valid triplets")
-            return validated
+        except Exception as e:
+            logger.error(f"API extraction error: {e}")
+            return []
 
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parsing error: {e}")
+    def _parse_response(self, response: str) -> List[Dict]:
+        """Parse JSON response from LLM"""
+        # Find the first JSON array of objects, or an empty array meaning no
+        # triplets; earlier brackets such as "[2]" in surrounding prose are skipped
+        triplets = None
+        start = response.find('[')
+        while start >= 0:
+            try:
+                # Decode the array starting there; trailing text is ignored
+                value, _ = _JSON_DECODER.raw_decode(response, start)
+            except (json.JSONDecodeError, RecursionError, ValueError):
+                # Malformed or deeply nested candidates are skipped like any other
+                value = None
+            if isinstance(value, list) and (not value or any(isinstance(item, dict) for item in value)):
+                triplets = value
+                break
+            start = response.find('[', start + 1)
+
+        if triplets is None:
+            logger.warning("No JSON array found in response")
             return []
 
+        # Validate triplet structure
+        validated = []
+        for triplet in triplets:
+            if not isinstance(triplet, dict):
+                continue
+            if all(key in triplet for key in ['head', 'relation', 'tail']):
+                # Add confidence if missing, and ensure it is a float
+                try:
+                    triplet['confidence'] = float(triplet.get('confidence', 0.8))
+                except (TypeError, ValueError):
+                    continue
+
+                validated.append(triplet)
+
+        logger.info(f"Extracted {len(validated)} valid triplets")
+        return validated
 
 if __name__ == "__main__":
     # Test extraction
@@ -1,32 +1,81 @@
 import pandas as pd
 import logging
+from collections import defaultdict
+from functools import lru_cache
+from math import ceil
 from typing import Dict, List
 from neo4j import GraphDatabase
 import time
 
 logger = logging.getLogger(__name__)
 
+# Columns sent to Neo4j per triplet, and defaults for the optional ones
+_IMPORT_COLUMNS = ['head', 'tail', 'relation', 'head_type', 'tail_type', 'confidence']
+_COLUMN_DEFAULTS = {'head_type': 'ENTITY', 'tail_type': 'ENTITY', 'confidence': 0.8}
+
+# Rows per import batch
+_BATCH_SIZE = 5000
+
+
+def _quote_label(label: str) -> str:
+    """Quote a value for use as a Cypher label"""
+    return "`" + str(label).replace("`", "``") + "`"
+
+
+@lru_cache(maxsize=None)
+def _entity_query(entity_type: str) -> str:
+    """Build the entity MERGE query with the label for one entity type"""
+    # Labels can't be parameters, so each type gets its own static query
+    return f"""
+        UNWIND $names AS name
+        MERGE (e:Entity {{name: name}})
+        SET e.type = $type, e:{_quote_label(entity_type)}
+        """
+
+
+# Relationships are merged after their entities exist, so nodes are matched
+_RELATION_QUERY = """
+    UNWIND $triplets AS triplet
+    MATCH (head:Entity {name: triplet.head})
+    MATCH (tail:Entity {name: triplet.tail})
+    MERGE (head)-[r:RELATION {type: triplet.relation}]->(tail)
+    SET r.confidence = triplet.confidence,
+        r.source = 'extracted',
+        r.created = datetime()
+    """
+
+
+def _write_batch(tx, entities: Dict[str, Dict], triplets_data: List[Dict]):
+    """Transaction function: merge every entity type, then the relationships"""
+    for entity_type, names in entities.items():
+        tx.run(_entity_query(entity_type), names=list(names), type=entity_type).consume()
+    tx.run(_RELATION_QUERY, triplets=triplets_data).consume()
+
 
 class Neo4jGraphBuilder:
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, verify: bool = False):
         self.config = config
         neo4j_config = config['neo4j']
 
         self.driver = GraphDatabase.driver(
             neo4j_config['uri'],
-            auth=(neo4j_config['username'], neo4j_config['password'])
+            auth=(neo4j_config['username'], neo4j_config['password']),
+            max_connection_pool_size=50,
+            connection_acquisition_timeout=60
         )
 
-        # Test connection
-        self._test_connection()
+        # Constraints and indexes are created once per builder
+        self._constraints_ready = False
+
+        # Test connection only when asked; otherwise the first query surfaces errors
+        if verify:
+            self._test_connection()
 
     def _test_connection(self):
         """Test Neo4j connection"""
         try:
-            with self.driver.session() as session:
-                result = session.run("RETURN 1 AS test")
-                value = result.single()["test"]
-                logger.info(f"Neo4j connection successful: {value}")
+            self.driver.verify_connectivity()
+            logger.info("Neo4j connection successful")
         except Exception as e:
             logger.error(f"Neo4j connection failed: {e}")
             raise
@@ -45,16 +94,18 @@ class Neo4jGraphBuilder:
         # Create constraints
         self._create_constraints()
 
-        # Import data in batches
-        batch_size = 100
-        total_batches = (len(df) // batch_size) + 1
+        # Convert the frame once, then import the records in batches
+        triplets_data = self._triplet_records(df)
+        batch_size = _BATCH_SIZE
+        total_batches = ceil(len(triplets_data) / batch_size)
 
-        for i in range(0, len(df), batch_size):
-            batch = df.iloc[i:i + batch_size]
-            self._import_batch(batch)
+        # One session for the whole import instead of one per batch
+        with self.driver.session() as session:
+            for batch_num, i in enumerate(range(0, len(triplets_data), batch_size), 1):
+                batch = triplets_data[i:i + batch_size]
+                self._import_batch(session, batch)
 
-            batch_num = (i // batch_size) + 1
-            logger.info(f"Imported batch {batch_num}/{total_batches} ({len(batch)} triplets)")
+                logger.info(f"Imported batch {batch_num}/{total_batches} ({len(batch)} triplets)")
 
         logger.info("Graph construction complete")
 
@@ -67,6 +118,9 @@ class Neo4jGraphBuilder:
 
     def _create_constraints(self):
         """Create database constraints"""
+        if self._constraints_ready:
+            return
+
         with self.driver.session() as session:
             # Create uniqueness constraint on entity name
             session.run("""
@@ -81,44 +135,27 @@ class Neo4jGraphBuilder:
 
             logger.info("Database constraints and indexes created")
 
-    def _import_batch(self, batch: pd.DataFrame):
+        self._constraints_ready = True
+
+    def _import_batch(self, session, triplets_data: List[Dict]):
         """Import a batch of triplets"""
-        query = """
-        UNWIND $triplets AS triplet
-        MERGE (head:Entity {name: triplet.head})
-        SET head.type = triplet.head_type
-        MERGE (tail:Entity {name: triplet.tail})
-        SET tail.type = triplet.tail_type
-
-        // Set specific labels based on type
-        CALL apoc.create.addLabels(head, [head.type]) YIELD node AS headNode
-        CALL apoc.create.addLabels(tail, [tail.type]) YIELD node AS tailNode
-
-        // Create relationship
-        MERGE (headNode)-[r:RELATION {type: triplet.relation}]->(tailNode)
-        SET r.confidence = triplet.confidence,
-            r.source = 'extracted',
-            r.created = datetime()
-        """
+        # Distinct entities per type, so each name is merged once per batch
+        entities = defaultdict(dict)
+        for triplet in triplets_data:
+            entities[triplet['head_type']][triplet['head']] = None
+            entities[triplet['tail_type']][triplet['tail']] = None
 
-        # Prepare data for Neo4j
-        triplets_data = []
-        for _, row in batch.iterrows():
-            triplet = {
-                'head': row['head'],
-                'tail': row['tail'],
-                'relation': row['relation'],
-                'head_type': row.get('head_type', 'ENTITY'),
-                'tail_type': row.get('tail_type', 'ENTITY'),
-                'confidence': float(row.get('confidence', 0.8))
-            }
-            triplets_data.append(triplet)
+        # Entities and relationships commit together; a failure rolls back the
+        # whole batch and is raised to the caller
+        session.execute_write(_write_batch, entities, triplets_data)
 
-        try:
-            with self.driver.session() as session:
-                session.run(query, triplets=triplets_data)
-        except Exception as e:
-            logger.error(f"Error importing batch: {e}")
+    def _triplet_records(self, df: pd.DataFrame) -> List[Dict]:
+        """Convert triplets to parameter dicts for Neo4j, filling optional columns with defaults"""
+        defaults = {col: value for col, value in _COLUMN_DEFAULTS.items() if col not in df}
+        if defaults:
+            df = df.assign(**defaults)
+
+        return df[_IMPORT_COLUMNS].astype({'confidence': 'float64'}).to_dict(orient='records')
 
     def get_graph_stats(self) -> Dict:
         """Get graph statistics"""
@@ -176,7 +213,7 @@ if __name__ == "__main__":
         {'head': 'Tesla', 'relation': 'LAUNCHED', 'tail': 'Model Y', 'confidence': 0.88},
     ])
 
-    builder = Neo4jGraphBuilder(config)
+    builder = Neo4jGraphBuilder(config, verify=True)
     builder.build_graph(test_data)
     stats = builder.get_graph_stats()
     print(f"Graph stats: {stats}")
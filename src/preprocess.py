@@ -1,17 +1,22 @@
 import re
 import logging
+from itertools import islice
 from typing import List, Dict
-import nltk
-from nltk.tokenize import sent_tokenize
 
-# Download NLTK data (first time only)
+# Optional: compiled sentence splitter, falls back to regex
 try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+    import blingfire
+except ImportError:
+    blingfire = None
 
 logger = logging.getLogger(__name__)
 
+# Text cleanup patterns, compiled once at import
+_URL_RE = re.compile(r'http\S+|www\S+|https\S+', re.MULTILINE)
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s.,!?-]')
+_WHITESPACE_RE = re.compile(r'\s+')
+_SENT_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z])')
+
 
 class TextPreprocessor:
     def __init__(self, config: Dict):
@@ -37,25 +42,33 @@ class TextPreprocessor:
         text = self._clean_text(text)
 
         # Split into sentences
-        sentences = sent_tokenize(text)
+        sentences = self._split_sentences(text)
 
-        # Filter and limit sentences
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
-        sentences = sentences[:self.max_sentences]
+        # Filter and limit sentences, stopping once enough are kept
+        stripped = (s.strip() for s in sentences)
+        sentences = list(islice((s for s in stripped if len(s) > 20), self.max_sentences))
 
         logger.info(f"Preprocessed text into {len(sentences)} sentences")
         return sentences
 
+    def _split_sentences(self, text: str) -> List[str]:
+        """Split cleaned text into sentences"""
+        if not text:
+            return []
+        if blingfire is not None:
+            return blingfire.text_to_sentences(text).split('\n')
+        return _SENT_RE.split(text)
+
     def _clean_text(self, text: str) -> str:
         """Clean text by removing unwanted characters"""
         # Remove URLs
-        text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
+        text = _URL_RE.sub('', text)
 
         # Remove special characters but keep punctuation
-        text = re.sub(r'[^\w\s.,!?-]', ' ', text)
+        text = _SPECIAL_CHARS_RE.sub(' ', text)
 
         # Replace multiple spaces with single space
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE_RE.sub(' ', text)
 
         # Remove extra whitespace
         text = text.strip()
@@ -1,11 +1,31 @@
 import logging
-from typing import Optional, Dict, List
+import pandas as pd
+from functools import lru_cache
+from typing import Optional, Dict, List, Tuple
 import re
 from .prompts import NL_TO_CYPHER_PROMPT
 from neo4j import GraphDatabase
 
 logger = logging.getLogger(__name__)
 
+# Question patterns and their Cypher; the entity is passed as $company
+_RULE_PATTERNS = [
+    (re.compile(r'what companies did (.+?) acquire'),
+     "MATCH (c:Company {name: $company})-[:ACQUIRED]->(target) RETURN target.name"),
+    (re.compile(r'who invested in (.+?)'),
+     "MATCH (investor)-[:INVESTED_IN]->(c:Company {name: $company}) RETURN investor.name"),
+    (re.compile(r'what products did (.+?) launch'),
+     "MATCH (c:Company {name: $company})-[:LAUNCHED]->(p:Product) RETURN p.name"),
+    (re.compile(r'who is the ceo of (.+?)'),
+     "MATCH (p:Person)-[:CEO_OF]->(c:Company {name: $company}) RETURN p.name"),
+    (re.compile(r'what companies partnered with (.+?)'),
+     "MATCH (c:Company)-[:PARTNERED_WITH]->(target:Company {name: $company}) RETURN c.name"),
+]
+
+
+class _ConversionFailed(Exception):
+    """Raised inside the cached conversion so failed LLM calls aren't memoized"""
+
 
 class NaturalLanguageQuery:
     def __init__(self, config: Dict):
@@ -49,19 +69,44 @@ class NaturalLanguageQuery:
             """
         }
 
-    def query_to_cypher(self, question: str, use_llm: bool = False) -> Optional[str]:
-        """Convert natural language question to Cypher query"""
-        question_lower = question.lower().strip()
+        # All template keys in one pattern; the lookahead reports a hit at every
+        # position, and alternation order keeps earlier templates first
+        self._template_rank = {pattern: i for i, pattern in enumerate(self.query_templates)}
+        self._template_re = re.compile(
+            '(?=(' + '|'.join(re.escape(pattern) for pattern in self.query_templates) + '))'
+        )
+
+        # Conversions memoized per instance, keyed on (question, use_llm)
+        self._cached_conversion = lru_cache(maxsize=1024)(self._convert)
+
+    def query_to_cypher(self, question: str, use_llm: bool = False) -> Optional[Tuple[str, Dict]]:
+        """Convert natural language question to a Cypher query and its parameters"""
+        try:
+            cypher, params = self._cached_conversion(question.strip(), use_llm)
+        except _ConversionFailed:
+            return None
+
+        # Copy so callers can't alter the cached parameters
+        return cypher, dict(params)
+
+    def _convert(self, question: str, use_llm: bool) -> Tuple[str, Dict]:
+        """Convert a question to Cypher, raising _ConversionFailed if the LLM fails"""
+        question_lower = question.lower()
 
-        # Check for predefined patterns
-        for pattern, template in self.query_templates.items():
-            if pattern in question_lower:
-                logger.info(f"Using predefined template for: {pattern}")
-                return template
+        # Check for predefined patterns; the earliest template found wins
+        hits = {match.group(1) for match in self._template_re.finditer(question_lower)}
+        if hits:
+            pattern = min(hits, key=self._template_rank.__getitem__)
+            logger.info(f"Using predefined template for: {pattern}")
+            return self.query_templates[pattern], {}
 
         # Use LLM for complex queries if enabled
         if use_llm and self.config['llm']['mode'] == 'api':
-            return self._llm_to_cypher(question)
+            cypher = self._llm_to_cypher(question)
+            if not cypher:
+                # Raised rather than returned so failures aren't cached
+                raise _ConversionFailed(question)
+            return cypher, {}
 
         # Simple rule-based conversion
         return self._rule_based_conversion(question)
@@ -73,7 +118,7 @@ class NaturalLanguageQuery:
 
             prompt = NL_TO_CYPHER_PROMPT.format(question=question)
 
-            response = openai.ChatCompletion.create(
+            response = openai.chat.completions.create(
                 model=self.config['llm']['api_model'],
                 messages=[
                     {"role": "system", "content": "You are a Cypher query generator."},
@@ -95,29 +140,16 @@ class NaturalLanguageQuery:
             logger.error(f"LLM query conversion failed: {e}")
             return None
 
-    def _rule_based_conversion(self, question: str) -> Optional[str]:
+    def _rule_based_conversion(self, question: str) -> Tuple[str, Dict]:
         """Simple rule-based conversion to Cypher"""
         question_lower = question.lower()
 
-        # Pattern matching rules
-        patterns = [
-            (r'what companies did (.+?) acquire',
-             "MATCH (c:Company {name: $company})-[:ACQUIRED]->(target) RETURN target.name"),
-            (r'who invested in (.+?)',
-             "MATCH (investor)-[:INVESTED_IN]->(c:Company {name: $company}) RETURN investor.name"),
-            (r'what products did (.+?) launch',
-             "MATCH (c:Company {name: $company})-[:LAUNCHED]->(p:Product) RETURN p.name"),
-            (r'who is the ceo of (.+?)',
-             "MATCH (p:Person)-[:CEO_OF]->(c:Company {name: $company}) RETURN p.name"),
-            (r'what companies partnered with (.+?)',
-             "MATCH (c:Company)-[:PARTNERED_WITH]->(target:Company {name: $company}) RETURN c.name"),
-        ]
-
-        for pattern, template in patterns:
-            match = re.search(pattern, question_lower)
+        # Entities are passed as parameters so Neo4j reuses the query plan
+        for pattern, template in _RULE_PATTERNS:
+            match = pattern.search(question_lower)
             if match:
                 entity = match.group(1).strip()
-                return template.replace('$company', f"'{entity.title()}'")
+                return template, {'company': entity.title()}
 
         # Default query
         return """
@@ -125,7 +157,7 @@ class NaturalLanguageQuery:
             WHERE n.name CONTAINS $term OR m.name CONTAINS $term
             RETURN n.name as source, type(r) as relationship, m.name as target
             LIMIT 10
-        """
+        """, {'term': question.strip()}
 
     def execute_query(self, cypher_query: str, params: Dict = None) -> List[Dict]:
         """Execute Cypher query and return results"""
@@ -134,12 +166,8 @@ class NaturalLanguageQuery:
 
         try:
             with self.driver.session() as session:
-                result = session.run(cypher_query, params)
-
-                # Convert to list of dictionaries
-                records = []
-                for record in result:
-                    records.append(dict(record))
+                # Convert to list of dictionaries in one call
+                records = session.run(cypher_query, params).data()
 
                 logger.info(f"Query executed, returned {len(records)} records")
                 return records
@@ -148,21 +176,38 @@ class NaturalLanguageQuery:
             logger.error(f"Query execution failed: {e}")
             return []
 
+    def execute_query_df(self, cypher_query: str, params: Dict = None) -> pd.DataFrame:
+        """Execute Cypher query and return results as a DataFrame"""
+        if params is None:
+            params = {}
+
+        try:
+            with self.driver.session() as session:
+                df = session.run(cypher_query, params).to_df()
+
+                logger.info(f"Query executed, returned {len(df)} records")
+                return df
+
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            return pd.DataFrame()
+
     def ask_question(self, question: str) -> List[Dict]:
         """Complete pipeline: question -> Cypher -> results"""
         logger.info(f"Processing question: {question}")
 
         # Convert to Cypher
-        cypher = self.query_to_cypher(question)
+        converted = self.query_to_cypher(question)
 
-        if not cypher:
+        if not converted:
             logger.warning("Could not convert question to Cypher")
             return []
 
-        logger.info(f"Generated Cypher: {cypher}")
+        cypher, params = converted
+        logger.info(f"Generated Cypher: {cypher} with params {params}")
 
         # Execute query
-        results = self.execute_query(cypher)
+        results = self.execute_query(cypher, params)
 
         return results
 
@@ -194,7 +239,8 @@ if __name__ == "__main__":
 
     for question in test_questions:
         print(f"\nQuestion: {question}")
-        cypher = nlq.query_to_cypher(question)
+        cypher, params = nlq.query_to_cypher(question)
         print(f"Cypher: {cypher}")
+        print(f"Params: {params}")
 
     nlq.close()
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""
+Regex relation extraction in the kg_finance_light pipelines
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("neo4j")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "kg_finance_light"))
+
+import kg_simple  # noqa: E402
+import main as light_main  # noqa: E402
+
+
+def _triples(triplets):
+    return {(t["head"], t["relation"], t["tail"]) for t in triplets}
+
+
+def test_simple_pipeline_keeps_overlapping_clauses():
+    pipeline = kg_simple.SimpleKGPipeline()
+
+    triplets = pipeline.extract_from_text("Elon Musk founded SpaceX and Tesla launched Cybertruck")
+
+    assert _triples(triplets) == {
+        ("Elon Musk", "FOUNDED", "SpaceX and Tesla launched Cybertruck"),
+        ("Tesla", "LAUNCHED", "Cybertruck"),
+    }
+
+
+def test_simple_pipeline_finds_every_relation_in_sentence():
+    pipeline = kg_simple.SimpleKGPipeline()
+
+    triplets = pipeline.extract_from_text("Apple launched iPhone and Microsoft acquired GitHub")
+
+    assert _triples(triplets) == {
+        ("Apple", "LAUNCHED", "iPhone and Microsoft acquired GitHub"),
+        ("Microsoft", "ACQUIRED", "GitHub"),
+    }
+
+
+def test_simple_kg_keeps_overlapping_clauses():
+    kg = light_main.SimpleKG()
+
+    assert _triples(kg.extract_relations("Elon Musk founded SpaceX and Tesla launched Cybertruck")) == {
+        ("Elon Musk", "FOUNDED", "SpaceX and Tesla launched Cybertruck"),
+        ("Tesla", "LAUNCHED", "Cybertruck"),
+    }
+    assert _triples(kg.extract_relations("Apple launched iPhone and Microsoft acquired GitHub")) == {
+        ("Apple launched iPhone and Microsoft", "ACQUIRED", "GitHub"),
+        ("Apple", "LAUNCHED", "iPhone and Microsoft acquired GitHub"),
+    }